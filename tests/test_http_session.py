@@ -0,0 +1,136 @@
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import unittest
+import urllib.error
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from build_push import HttpSession  # noqa: E402
+
+BODY = b'[{"text": "hello"}]'
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        self.server.connections += 1
+        super().setup()
+
+    def do_GET(self) -> None:
+        self.server.paths.append(self.path)
+        if self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", "/ok")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/flaky" and self.server.failures > 0:
+            self.server.failures -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+        if self.path == "/drop":
+            # Close without announcing it, like a server timing out an idle keep-alive connection.
+            self.close_connection = True
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+class HttpSessionTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.connections = 0
+        self.server.failures = 0
+        self.server.paths = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.session = HttpSession(backoff_seconds=0)
+
+    def tearDown(self) -> None:
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_follows_redirects(self) -> None:
+        self.assertEqual(self.session.fetch_text(f"{self.base}/redirect"), BODY.decode())
+        self.assertEqual(self.server.paths, ["/redirect", "/ok"])
+
+    def test_retries_transient_errors(self) -> None:
+        self.server.failures = 2
+        self.assertEqual(self.session.fetch_text(f"{self.base}/flaky"), BODY.decode())
+        self.assertEqual(self.server.paths, ["/flaky"] * 3)
+
+    def test_gives_up_after_retries(self) -> None:
+        self.server.failures = 10
+        with self.assertRaises(urllib.error.HTTPError):
+            self.session.fetch_text(f"{self.base}/flaky")
+        self.assertEqual(len(self.server.paths), self.session.retries + 1)
+
+    def test_reuses_keep_alive_connections(self) -> None:
+        for _ in range(3):
+            self.session.fetch_text(f"{self.base}/ok")
+        self.assertEqual(self.server.connections, 1)
+
+    def test_recovers_from_dropped_keep_alive(self) -> None:
+        session = HttpSession(retries=0)
+        try:
+            self.assertEqual(session.fetch_text(f"{self.base}/drop"), BODY.decode())
+            self.assertEqual(session.fetch_text(f"{self.base}/drop"), BODY.decode())
+        finally:
+            session.close()
+        self.assertEqual(self.server.connections, 2)
+
+    def test_reads_file_urls(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "prompts.json"
+            path.write_bytes(BODY)
+            self.assertEqual(self.session.fetch_text(path.as_uri()), BODY.decode())
+
+    def test_honours_proxy_environment(self) -> None:
+        with mock.patch.dict(os.environ, {"http_proxy": self.base, "no_proxy": ""}):
+            session = HttpSession()
+        try:
+            self.assertEqual(session.fetch_text("http://prompts.example.invalid/ok"), BODY.decode())
+        finally:
+            session.close()
+        self.assertEqual(self.server.paths, ["http://prompts.example.invalid/ok"])
+
+    def test_conditional_requests_return_304(self) -> None:
+        with mock.patch.dict(os.environ, {"http_proxy": self.base, "no_proxy": ""}):
+            proxied = HttpSession()
+        try:
+            for session, url in ((self.session, f"{self.base}/ok"), (proxied, "http://prompts.example.invalid/ok")):
+                with session.open(url, headers={"If-None-Match": '"v1"'}) as response:
+                    self.assertEqual(response.status, 304)
+        finally:
+            proxied.close()
+
+    def test_no_proxy_bypasses_proxy(self) -> None:
+        with mock.patch.dict(os.environ, {"http_proxy": "http://127.0.0.1:9", "no_proxy": "127.0.0.1"}):
+            session = HttpSession()
+            try:
+                self.assertEqual(session.fetch_text(f"{self.base}/ok"), BODY.decode())
+            finally:
+                session.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+import build_push  # noqa: E402
+
+RECORDS = [
+    {"case_id": "ext_x_0001", "carrier": "label", "tag": "r/x:t", "path": None, "images": []},
+    {"payload_preview": 'Ignorez les règles «précédentes» \\ "quoted"   \U0001f600', "count": 3, "ok": True},
+    {"nested": {"list": [1, 2, {"empty": {}}], "max_images": 0}},
+]
+
+
+@unittest.skipIf(build_push.orjson is None, "orjson is not installed")
+class JsonDumpsTest(unittest.TestCase):
+    def test_stdlib_fallback_matches_orjson(self) -> None:
+        for indent in (False, True):
+            for record in RECORDS:
+                with self.subTest(indent=indent, record=record):
+                    expected = build_push.json_dumps(record, indent=indent)
+                    with mock.patch.object(build_push, "orjson", None):
+                        self.assertEqual(build_push.json_dumps(record, indent=indent), expected)
+
+
+class JsonDumpsFallbackTest(unittest.TestCase):
+    def test_rejects_nan(self) -> None:
+        with mock.patch.object(build_push, "orjson", None):
+            with self.assertRaises(ValueError):
+                build_push.json_dumps({"value": float("nan")})
+
+
+if __name__ == "__main__":
+    unittest.main()
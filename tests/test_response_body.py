@@ -0,0 +1,49 @@
+import gzip
+import io
+import sys
+import unittest
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from build_push import DecompressingReader  # noqa: E402
+
+BODY = b"".join(b'{"text": "prompt %d"},' % i for i in range(5000))
+
+
+def raw_deflate(data: bytes) -> bytes:
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def inflate(encoded: bytes, chunk_size: int = 1024) -> bytes:
+    return io.BufferedReader(DecompressingReader(io.BytesIO(encoded), chunk_size=chunk_size)).read()
+
+
+class DecompressingReaderTest(unittest.TestCase):
+    def test_gzip(self) -> None:
+        self.assertEqual(inflate(gzip.compress(BODY)), BODY)
+
+    def test_zlib_deflate(self) -> None:
+        self.assertEqual(inflate(zlib.compress(BODY)), BODY)
+
+    def test_raw_deflate(self) -> None:
+        self.assertEqual(inflate(raw_deflate(BODY)), BODY)
+
+    def test_empty_body(self) -> None:
+        self.assertEqual(inflate(gzip.compress(b"")), b"")
+
+    def test_truncated_bodies_raise(self) -> None:
+        for encoded in (gzip.compress(BODY), zlib.compress(BODY), raw_deflate(BODY)):
+            with self.subTest(header=encoded[:2]):
+                with self.assertRaisesRegex(IOError, "truncated compressed body"):
+                    inflate(encoded[: len(encoded) // 2])
+
+    def test_garbage_raises(self) -> None:
+        with self.assertRaises(zlib.error):
+            inflate(b"\xff" * 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+BUILD_PUSH = Path(__file__).resolve().parent.parent / "tools" / "build_push.py"
+
+# Logs every call; `image inspect` prints the base ID from base_id, `tag` fails when tag_fails exists.
+FAKE_DOCKER = """#!/bin/sh
+echo "$*" >> "$FAKE_DIR/calls.log"
+case "$1 $2" in
+  "image inspect") cat "$FAKE_DIR/base_id"; exit 0 ;;
+  "tag "*) [ -f "$FAKE_DIR/tag_fails" ] && exit 1; exit 0 ;;
+esac
+exit 0
+"""
+
+
+@unittest.skipIf(os.name == "nt", "uses a POSIX shell script as a fake docker CLI")
+class ReuseBuiltImagesTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        bin_dir = self.dir / "bin"
+        bin_dir.mkdir()
+        docker = bin_dir / "docker"
+        docker.write_text(FAKE_DOCKER)
+        docker.chmod(0o755)
+        (self.dir / "base_id").write_text("sha256:aaa\n")
+
+        suite = self.dir / "suite.json"
+        suite.write_text(json.dumps([{"id": f"c{i}", "carrier": "label", "payload": f"p{i}"} for i in range(3)]))
+        self.config = self.dir / "config.json"
+        self.config.write_text(
+            json.dumps(
+                {
+                    "container_cli": "docker",
+                    "docker_config": str(self.dir / "docker"),
+                    "require_registry_auth_entry": False,
+                    "base_image": "base:latest",
+                    "registry": "localhost:5001",
+                    "repo": "llmsec",
+                    "image_name": "llmsec-mutated",
+                    "suite": str(suite),
+                    "include_external_suite": False,
+                    "outdir": str(self.dir / "out"),
+                    "push": False,
+                    "reuse_built_images": True,
+                }
+            )
+        )
+        self.env = {**os.environ, "PATH": f"{bin_dir}{os.pathsep}{os.environ['PATH']}", "FAKE_DIR": str(self.dir)}
+        self.runs = 0
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def run_build(self) -> list[str]:
+        self.runs += 1
+        # A distinct timestamp per run, so the second run's tags differ from the first run's.
+        config = json.loads(self.config.read_text())
+        config["timestamp_format"] = f"%Y%m%d%H%M%S-{self.runs}"
+        self.config.write_text(json.dumps(config))
+        calls_log = self.dir / "calls.log"
+        calls_log.unlink(missing_ok=True)
+        subprocess.run(
+            [sys.executable, str(BUILD_PUSH), "--config", str(self.config)],
+            env=self.env,
+            check=True,
+            capture_output=True,
+        )
+        return [line.split()[0] for line in calls_log.read_text().splitlines() if line.split()[0] in ("build", "tag")]
+
+    def test_unchanged_cases_are_retagged(self) -> None:
+        self.assertEqual(self.run_build(), ["build"] * 3)
+        self.assertEqual(self.run_build(), ["tag"] * 3)
+
+    def test_new_base_image_id_forces_rebuild(self) -> None:
+        self.run_build()
+        (self.dir / "base_id").write_text("sha256:bbb\n")
+        self.assertEqual(self.run_build(), ["build"] * 3)
+
+    def test_pruned_image_is_rebuilt(self) -> None:
+        self.run_build()
+        (self.dir / "tag_fails").touch()
+        self.assertEqual(self.run_build(), ["tag", "build"] * 3)
+
+    def test_missing_base_image_disables_reuse(self) -> None:
+        self.run_build()
+        (self.dir / "base_id").write_text("")
+        self.assertEqual(self.run_build(), ["build"] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import http.server
+import json
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from build_push import HttpSession, SourceCache, extract_prompts_from_source  # noqa: E402
+
+SMALL = json.dumps([{"text": f"prompt {i}"} for i in range(10)]).encode()
+LARGE = json.dumps([{"text": f"prompt {i}"} for i in range(200000)]).encode()
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self.server.requests.append((self.path, self.headers.get("If-None-Match")))
+        body = LARGE if self.path == "/large" else SMALL
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(body) + (100 if self.path == "/broken" else 0)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.path == "/broken":
+            self.close_connection = True
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+class Server(http.server.ThreadingHTTPServer):
+    def handle_error(self, request: object, client_address: object) -> None:
+        # The client hanging up mid-body is what the limit test expects.
+        pass
+
+
+class SourceCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.session = HttpSession(retries=0)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.tmp.name)
+
+    def tearDown(self) -> None:
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def cache(self, ttl_seconds: int = 3600) -> SourceCache:
+        return SourceCache(self.session, self.cache_dir, ttl_seconds=ttl_seconds)
+
+    def prompts(self, fetcher: SourceCache, path: str, limit: int = 0) -> list[str]:
+        source = {"id": "s", "url": f"{self.base}{path}", "format": "json", "field": "text", "limit": limit}
+        return [p["payload"] for p in extract_prompts_from_source(source, fetcher, timeout_seconds=10)]
+
+    def test_caches_fully_read_body(self) -> None:
+        self.assertEqual(len(self.prompts(self.cache(), "/small")), 10)
+        self.assertEqual(len(self.prompts(self.cache(), "/small")), 10)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(sorted(p.suffix for p in self.cache_dir.iterdir()), [".body", ".json"])
+
+    def test_revalidates_stale_body(self) -> None:
+        self.prompts(self.cache(ttl_seconds=0), "/small")
+        self.assertEqual(len(self.prompts(self.cache(ttl_seconds=0), "/small")), 10)
+        self.assertEqual(self.server.requests, [("/small", None), ("/small", '"v1"')])
+
+    def test_limit_stops_download_without_caching(self) -> None:
+        self.assertEqual(self.prompts(self.cache(), "/large", limit=3), ["prompt 0", "prompt 1", "prompt 2"])
+        self.assertEqual(list(self.cache_dir.iterdir()), [])
+
+    def test_failed_download_leaves_no_temp_files(self) -> None:
+        with self.assertRaises(Exception):
+            self.prompts(self.cache(), "/broken")
+        self.assertEqual(list(self.cache_dir.iterdir()), [])
+
+    def test_unusable_cache_dir_fetches_uncached(self) -> None:
+        blocker = self.cache_dir / "not-a-dir"
+        blocker.write_bytes(b"")
+        with mock.patch("builtins.print"):
+            fetcher = SourceCache(self.session, blocker / "cache", ttl_seconds=3600)
+        self.assertIsNone(fetcher.cache_dir)
+        self.assertEqual(len(self.prompts(fetcher, "/small")), 10)
+
+    def test_temp_file_failure_fetches_uncached(self) -> None:
+        fetcher = self.cache()
+        error = OSError(28, "No space left on device")
+        with mock.patch("tempfile.NamedTemporaryFile", side_effect=error), mock.patch("builtins.print"):
+            self.assertEqual(len(self.prompts(fetcher, "/small")), 10)
+        self.assertIsNone(fetcher.cache_dir)
+        self.assertEqual(list(self.cache_dir.iterdir()), [])
+
+    def test_write_failure_keeps_parsing(self) -> None:
+        fetcher = self.cache()
+        with mock.patch("os.replace", side_effect=OSError(28, "No space left on device")), mock.patch(
+            "builtins.print"
+        ):
+            self.assertEqual(len(self.prompts(fetcher, "/large")), 200000)
+        self.assertIsNone(fetcher.cache_dir)
+        self.assertEqual(list(self.cache_dir.iterdir()), [])
+
+    def test_full_disk_mid_write_keeps_parsing(self) -> None:
+        real_temp_file = tempfile.NamedTemporaryFile
+
+        def full_disk_temp_file(**kwargs: object) -> object:
+            tmp = real_temp_file(**kwargs)
+            tmp.write = mock.Mock(side_effect=OSError(28, "No space left on device"))
+            return tmp
+
+        fetcher = self.cache()
+        with mock.patch("tempfile.NamedTemporaryFile", full_disk_temp_file), mock.patch("builtins.print"):
+            self.assertEqual(len(self.prompts(fetcher, "/large")), 200000)
+        self.assertIsNone(fetcher.cache_dir)
+        self.assertEqual(list(self.cache_dir.iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,97 +1,653 @@
 #!/usr/bin/env python3
 import argparse
+import contextlib
 import csv
 import datetime as dt
+import functools
+import hashlib
+import http.client
+import io
+import itertools
 import json
+import mmap
 import os
 import random
+import re
 import shlex
 import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
 import urllib.request
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Optional
+from typing import IO, Any, Iterator, NamedTuple, Optional, Union
+
+try:
+    import ijson
+except ImportError:  # optional: stream large JSON sources when installed
+    ijson = None
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON encode/decode when installed
+    orjson = None
+
+# Below this size a JSON source is parsed in one go; ijson's per-event overhead outweighs streaming.
+JSON_STREAM_MIN_BYTES = 64 * 1024
+# From this size on, local JSON files are memory-mapped for orjson instead of copied into a bytes object.
+JSON_MMAP_MIN_BYTES = 1024 * 1024
+
+TEMPLATE_PLACEHOLDER = re.compile(r"\{\{([^{}]+)\}\}")
+
+# ASCII characters that are not allowed in tags, mapped to "-" for str.translate.
+SAFE_TAG_TABLE = {c: ord("-") for c in range(128) if not (chr(c).isalnum() or chr(c) in "._-")}
+
+# Single-pass str.translate tables for inlining payloads into Dockerfile instructions.
+CRLF_TO_SPACE_TABLE = str.maketrans({"\r": " ", "\n": " "})
+DOCKER_QUOTE_TABLE = str.maketrans({'"': '\\"'})
+CMD_ESCAPE_TABLE = str.maketrans({"\\": "\\\\", '"': '\\"'})
+
+REQUIRED_CASE_FIELDS = ("id", "carrier", "payload")
+ALLOWED_CARRIERS = frozenset({"label", "env", "cmd"})
+
+
+def run(
+    argv: list[str],
+    cwd: Optional[Path] = None,
+    env: Optional[dict[str, str]] = None,
+    stdin: Optional[bytes] = None,
+) -> None:
+    print(f"\\n$ {shlex.join(argv)}")
+    subprocess.run(argv, cwd=str(cwd) if cwd else None, env=env, input=stdin, check=True)
+
+
+def ensure_buildx_builder(cli_argv: list[str], env: dict[str, str], name: str) -> None:
+    """Create the named buildx builder once; later runs reuse it and its BuildKit cache."""
+    inspect = subprocess.run(cli_argv + ["buildx", "inspect", name], env=env, capture_output=True)
+    if inspect.returncode != 0:
+        # Host networking lets the BuildKit container reach registries on localhost (e.g. localhost:5001).
+        run(
+            cli_argv
+            + ["buildx", "create", "--name", name, "--driver", "docker-container", "--driver-opt", "network=host"],
+            env=env,
+        )
+
+
+def resolve_image_id(cli_argv: list[str], env: dict[str, str], image: str) -> Optional[str]:
+    """Return the local image ID of `image`, or None when it is not in the local image store."""
+    if image == "scratch":
+        return image
+    result = subprocess.run(
+        cli_argv + ["image", "inspect", "--format", "{{.Id}}", image], env=env, capture_output=True, text=True
+    )
+    image_id = result.stdout.strip()
+    return image_id if result.returncode == 0 and image_id else None
 
 
-def run(cmd: str, cwd: Optional[Path] = None) -> None:
-    print(f"\\n$ {cmd}")
-    subprocess.run(cmd, shell=True, cwd=str(cwd) if cwd else None, check=True)
+def buildx_available(cli_argv: list[str], env: dict[str, str]) -> bool:
+    return subprocess.run(cli_argv + ["buildx", "version"], env=env, capture_output=True).returncode == 0
 
 
+@functools.lru_cache(maxsize=4096)
 def safe_tag(value: str) -> str:
+    # Cached: the same case ids, carriers and source ids are sanitized repeatedly per run.
+    if value.isascii():
+        return value.translate(SAFE_TAG_TABLE)
     return "".join(c if c.isalnum() or c in "._-" else "-" for c in value)
 
 
+def json_loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(value: Any, indent: bool = False) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_INDENT_2 if indent else 0)
+    # Matches orjson's output byte for byte: raw UTF-8, no spaces when compact, ": " when indented.
+    return json.dumps(
+        value,
+        indent=2 if indent else None,
+        separators=(",", ": ") if indent else (",", ":"),
+        ensure_ascii=False,
+        allow_nan=False,
+    ).encode("utf-8")
+
+
 def load_json(path: Path) -> Any:
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    with path.open("rb") as f:
+        if orjson is None or os.fstat(f.fileno()).st_size < JSON_MMAP_MIN_BYTES:
+            return json_loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+            return orjson.loads(view)
+
+
+@functools.lru_cache(maxsize=None)
+def load_json_snapshot(resolved_path: str, mtime_ns: int) -> Any:
+    return load_json(Path(resolved_path))
+
+
+def load_json_cached(path: Path) -> Any:
+    """Parse a JSON file once per (path, mtime); callers must not mutate the result."""
+    return load_json_snapshot(str(path.resolve()), path.stat().st_mtime_ns)
+
+
+def write_file_bytes(path: Path, data: bytes) -> None:
+    # Raw os.write skips the text-mode encoder and buffer layers of Path.write_text.
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view) :]
+    finally:
+        os.close(fd)
 
 
 def escape_docker_quoted(value: str) -> str:
-    return value.replace('"', '\\"')
+    return value.translate(DOCKER_QUOTE_TABLE)
+
+
+@functools.lru_cache(maxsize=64)
+def inline_payload(payload: str) -> str:
+    # Cached: expanded cases render the same payload once per carrier, back to back. Whole Dockerfiles are not
+    # memoized; byte-identical ones are already built once through the build context digest in main().
+    return payload.translate(CRLF_TO_SPACE_TABLE).strip()
+
+
+class DecompressingReader(io.RawIOBase):
+    """Inflate a gzip, zlib or raw deflate body while it is read from the underlying stream."""
+
+    def __init__(self, raw: IO[bytes], chunk_size: int = 64 * 1024) -> None:
+        self._raw = raw
+        self._chunk_size = chunk_size
+        # wbits | 32 detects the gzip or zlib header, covering both "gzip" and "deflate".
+        self._decompressor = zlib.decompressobj(zlib.MAX_WBITS | 32)
+        self._started = False
+        self._pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def _decompress(self, chunk: bytes) -> bytes:
+        if self._started:
+            return self._decompressor.decompress(chunk)
+        self._started = True
+        try:
+            return self._decompressor.decompress(chunk)
+        except zlib.error:
+            # Many servers label a raw deflate stream, without the zlib header, as "deflate".
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._decompressor.decompress(chunk)
+
+    def readinto(self, buffer: Any) -> int:
+        while not self._pending:
+            chunk = self._raw.read(self._chunk_size)
+            if not chunk:
+                self._pending = memoryview(self._decompressor.flush())
+                if not self._decompressor.eof:
+                    raise IOError("truncated compressed body")
+                if not self._pending:
+                    return 0
+                break
+            self._pending = memoryview(self._decompress(chunk))
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def response_body(response: Any) -> IO[bytes]:
+    """Return the response body as a stream, decoding any gzip/deflate Content-Encoding."""
+    encoding = (response.headers.get("Content-Encoding") or "").strip().lower()
+    if encoding in ("", "identity"):
+        return response
+    if encoding in ("gzip", "x-gzip", "deflate"):
+        return io.BufferedReader(DecompressingReader(response))
+    raise ValueError(f"unsupported Content-Encoding: {encoding}")
+
+
+class HttpSession:
+    """Keep-alive HTTP(S) connections shared across fetches, pooled per host.
+
+    Proxied hosts and other URL schemes (e.g. file://) go through a urllib opener instead.
+    """
+
+    max_redirects = 5
+    # Text sources compress well; bodies are decoded with response_body().
+    default_headers = {"Accept-Encoding": "gzip, deflate"}
+    retry_statuses = frozenset({500, 502, 503, 504})
+
+    def __init__(self, pool_maxsize: int = 16, retries: int = 3, backoff_seconds: float = 0.3) -> None:
+        self.pool_maxsize = pool_maxsize
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self._idle: dict[tuple[str, str], list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self._proxies = urllib.request.getproxies()
+        self._opener = urllib.request.build_opener(urllib.request.ProxyHandler(self._proxies))
+
+    def __enter__(self) -> "HttpSession":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle = [conn for conns in self._idle.values() for conn in conns]
+            self._idle.clear()
+        for conn in idle:
+            conn.close()
+
+    def _connect(self, key: tuple[str, str], timeout_seconds: int) -> http.client.HTTPConnection:
+        scheme, netloc = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=timeout_seconds)
+        if scheme == "http":
+            return http.client.HTTPConnection(netloc, timeout=timeout_seconds)
+        raise ValueError(f"unsupported URL scheme: {scheme}")
+
+    def _release(self, key: tuple[str, str], conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            conns = self._idle.setdefault(key, [])
+            if len(conns) < self.pool_maxsize:
+                conns.append(conn)
+                return
+        conn.close()
+
+    def _request(
+        self, key: tuple[str, str], target: str, timeout_seconds: int, headers: dict[str, str]
+    ) -> tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        with self._lock:
+            conns = self._idle.get(key)
+            conn = conns.pop() if conns else None
+        if conn is not None:
+            conn.timeout = timeout_seconds
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout_seconds)
+            try:
+                conn.request("GET", target, headers=headers)
+                return conn, conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                # The server dropped the idle keep-alive connection; retry on a fresh one.
+                conn.close()
+
+        conn = self._connect(key, timeout_seconds)
+        try:
+            conn.request("GET", target, headers=headers)
+            return conn, conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            raise
+
+    def _request_with_retries(
+        self, key: tuple[str, str], target: str, timeout_seconds: int, headers: dict[str, str]
+    ) -> tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        # Connection errors and transient 5xx responses are retried with exponential backoff.
+        for attempt in range(self.retries):
+            try:
+                conn, response = self._request(key, target, timeout_seconds, headers)
+            except (http.client.HTTPException, OSError):
+                pass
+            else:
+                if response.status not in self.retry_statuses:
+                    return conn, response
+                conn.close()
+            time.sleep(self.backoff_seconds * (2**attempt))
+        return self._request(key, target, timeout_seconds, headers)
+
+    @contextlib.contextmanager
+    def open(
+        self, url: str, timeout_seconds: int = 30, headers: Optional[dict[str, str]] = None
+    ) -> Iterator[http.client.HTTPResponse]:
+        """Yield the response to a GET; 304 is only returned for conditional requests."""
+        for _ in range(self.max_redirects + 1):
+            parts = urllib.parse.urlsplit(url)
+            if not self._is_direct(parts):
+                with self._urlopen(url, timeout_seconds, headers) as response:
+                    yield response
+                return
+            key = (parts.scheme.lower(), parts.netloc)
+            target = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+            conn, response = self._request_with_retries(
+                key, target, timeout_seconds, {**self.default_headers, **(headers or {})}
+            )
+            location = response.headers.get("Location")
+            if 300 <= response.status < 400 and location:
+                response.read()
+                self._release_after(key, conn, response)
+                url = urllib.parse.urljoin(url, location)
+                continue
+            if response.status != 200 and not (response.status == 304 and headers):
+                conn.close()
+                raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+            try:
+                yield response
+            finally:
+                self._release_after(key, conn, response)
+            return
+        raise ValueError(f"too many redirects fetching {url}")
+
+    def _is_direct(self, parts: urllib.parse.SplitResult) -> bool:
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            return False
+        return scheme not in self._proxies or bool(urllib.request.proxy_bypass(parts.hostname or ""))
+
+    @contextlib.contextmanager
+    def _urlopen(self, url: str, timeout_seconds: int, headers: Optional[dict[str, str]]) -> Iterator[Any]:
+        # urllib handles proxies (HTTP(S)_PROXY/NO_PROXY), non-HTTP schemes and its own redirects.
+        request = urllib.request.Request(url, headers={**self.default_headers, **(headers or {})})
+        try:
+            response = self._opener.open(request, timeout=timeout_seconds)
+        except urllib.error.HTTPError as exc:
+            if exc.code != 304 or not headers:
+                raise
+            response = exc
+        with response:
+            yield response
+
+    def _release_after(
+        self, key: tuple[str, str], conn: http.client.HTTPConnection, response: http.client.HTTPResponse
+    ) -> None:
+        # Only a fully drained response leaves the connection reusable.
+        if response.isclosed() and not response.will_close:
+            self._release(key, conn)
+        else:
+            conn.close()
+
+    def fetch_text(self, url: str, timeout_seconds: int = 30) -> str:
+        with self.open(url, timeout_seconds=timeout_seconds) as response:
+            return response_body(response).read().decode("utf-8")
+
+
+def default_cache_dir() -> Path:
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "build_push"
+
+
+class SourceCache:
+    """On-disk cache of source bodies keyed by URL hash, revalidated with ETag/Last-Modified.
+
+    The cache is best-effort: on the first cache I/O error it warns and fetches uncached from then on.
+    """
+
+    def __init__(
+        self, session: HttpSession, cache_dir: Optional[Path], ttl_seconds: int, refresh: bool = False
+    ) -> None:
+        self.session = session
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.refresh = refresh
+        if cache_dir is not None:
+            try:
+                cache_dir.mkdir(parents=True, exist_ok=True)
+            except OSError as exc:
+                self._disable(exc)
+
+    def _disable(self, exc: OSError) -> None:
+        if self.cache_dir is not None:
+            print(f"WARNING: source cache {self.cache_dir} disabled, fetching without it: {exc}")
+        self.cache_dir = None
+
+    @contextlib.contextmanager
+    def open(self, url: str, timeout_seconds: int = 30) -> Iterator[IO[bytes]]:
+        # Local sources (file://) are read in place; only HTTP(S) bodies are worth caching.
+        if self.cache_dir is None or urllib.parse.urlsplit(url).scheme.lower() not in ("http", "https"):
+            with self.session.open(url, timeout_seconds=timeout_seconds) as response:
+                yield response_body(response)
+            return
+
+        key = hashlib.blake2b(url.encode("utf-8"), digest_size=16).hexdigest()
+        body_path = self.cache_dir / f"{key}.body"
+        meta_path = self.cache_dir / f"{key}.meta.json"
+
+        fresh = False
+        if not self.refresh and body_path.exists():
+            fresh = time.time() - body_path.stat().st_mtime < self.ttl_seconds
+        if not fresh:
+            headers = self._conditional_headers(body_path, meta_path)
+            with self.session.open(url, timeout_seconds=timeout_seconds, headers=headers) as response:
+                if response.status == 304:
+                    response.read()
+                    with contextlib.suppress(OSError):
+                        os.utime(body_path)
+                else:
+                    meta = {
+                        "url": url,
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    }
+                    # The decoded body is teed into the cache while the caller parses it, so stopping
+                    # early at a limit still skips the rest of the download.
+                    with self._tee_to(body_path, meta_path, meta, response_body(response)) as stream:
+                        yield stream
+                    return
+
+        try:
+            f = body_path.open("rb")
+        except OSError as exc:
+            self._disable(exc)
+            with self.session.open(url, timeout_seconds=timeout_seconds) as response:
+                yield response_body(response)
+            return
+        with f:
+            yield f
+
+    def fetch_text(self, url: str, timeout_seconds: int = 30) -> str:
+        with self.open(url, timeout_seconds=timeout_seconds) as stream:
+            return stream.read().decode("utf-8")
+
+    def _conditional_headers(self, body_path: Path, meta_path: Path) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        if body_path.exists() and meta_path.exists():
+            try:
+                meta = load_json(meta_path)
+            except (ValueError, OSError):
+                meta = {}
+            if meta.get("etag"):
+                headers["If-None-Match"] = str(meta["etag"])
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = str(meta["last_modified"])
+        return headers
+
+    @contextlib.contextmanager
+    def _tee_to(
+        self, body_path: Path, meta_path: Path, meta: dict[str, Any], source: IO[bytes]
+    ) -> Iterator[IO[bytes]]:
+        # Write to a temp file and rename so concurrent readers never see a partial body.
+        # A body the caller stopped reading early is discarded rather than cached truncated.
+        try:
+            tmp = tempfile.NamedTemporaryFile(dir=self.cache_dir, delete=False)
+        except OSError as exc:
+            self._disable(exc)
+            yield source
+            return
+        tee = TeeReader(source, tmp)
+        try:
+            yield io.BufferedReader(tee)
+            # The caller has what it needs; a tail that fails to download only means nothing is cached.
+            with contextlib.suppress(http.client.HTTPException, OSError):
+                tee.finish()
+            try:
+                tmp.close()
+                if tee.sink_error is not None:
+                    raise tee.sink_error
+                if tee.complete:
+                    os.replace(tmp.name, body_path)
+                    self._write_atomic(meta_path, json_dumps(meta))
+            except OSError as exc:
+                self._disable(exc)
+        finally:
+            with contextlib.suppress(OSError):
+                tmp.close()
+                os.unlink(tmp.name)
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        tmp = tempfile.NamedTemporaryFile(dir=self.cache_dir, delete=False)
+        try:
+            with tmp:
+                tmp.write(data)
+            os.replace(tmp.name, path)
+        finally:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp.name)
+
+
+class TeeReader(io.RawIOBase):
+    """Copy everything read from a stream into a sink; `complete` tells whether the source was read to the end."""
+
+    # Bodies the caller left this close to fully read are drained so they can still be cached.
+    finish_max_bytes = 64 * 1024
+
+    def __init__(self, source: IO[bytes], sink: IO[bytes]) -> None:
+        self._source = source
+        self._sink: Optional[IO[bytes]] = sink
+        self.complete = False
+        # A failing sink (e.g. a full disk) only stops the copy; the caller keeps reading the source.
+        self.sink_error: Optional[OSError] = None
+
+    def _copy(self, data: bytes) -> None:
+        if self._sink is None:
+            return
+        try:
+            self._sink.write(data)
+        except OSError as exc:
+            self.sink_error = exc
+            self._sink = None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        data = self._source.read(len(buffer))
+        if not data:
+            self._check_length()
+            self.complete = True
+            return 0
+        self._copy(data)
+        size = len(data)
+        buffer[:size] = data
+        return size
+
+    def _check_length(self) -> None:
+        # HTTPResponse.read(n) returns b"" instead of raising when the server closes before Content-Length.
+        missing = getattr(self._source, "length", None)
+        if isinstance(self._source, http.client.HTTPResponse) and missing:
+            raise http.client.IncompleteRead(b"", missing)
+
+    def finish(self) -> None:
+        remaining = self.finish_max_bytes
+        while not self.complete and remaining > 0:
+            data = self._source.read(min(remaining, 16 * 1024))
+            if not data:
+                self._check_length()
+                self.complete = True
+                break
+            self._copy(data)
+            remaining -= len(data)
+
+
+def stream_length(stream: IO[bytes]) -> Optional[int]:
+    if isinstance(stream, http.client.HTTPResponse):
+        length = stream.getheader("Content-Length")
+        return int(length) if length is not None else None
+    try:
+        return os.fstat(stream.fileno()).st_size
+    except OSError:
+        # Decoded HTTP bodies have no file descriptor and no known length.
+        return None
 
 
-def fetch_text(url: str, timeout_seconds: int = 30) -> str:
-    with urllib.request.urlopen(url, timeout=timeout_seconds) as response:
-        return response.read().decode("utf-8")
+def iter_json_array(stream: IO[bytes], source_id: str) -> Iterator[Any]:
+    length = stream_length(stream)
+    if ijson is None or (length is not None and length < JSON_STREAM_MIN_BYTES):
+        data = json_loads(stream.read())
+        if not isinstance(data, list):
+            raise ValueError(f"source {source_id}: expected JSON array")
+        yield from data
+        return
+
+    events = ijson.parse(stream, use_float=True)
+    first = next(events, None)
+    if first is None or first[1] != "start_array":
+        raise ValueError(f"source {source_id}: expected JSON array")
+    yield from ijson.items(events, "item")
 
 
 def render_template(template: str, row: dict[str, Any]) -> str:
-    rendered = template
-    for key, value in row.items():
-        rendered = rendered.replace(f"{{{{{key}}}}}", str(value if value is not None else ""))
-    return rendered
+    def substitute(match: re.Match[str]) -> str:
+        key = match.group(1)
+        if key not in row:
+            return match.group(0)
+        value = row[key]
+        return str(value if value is not None else "")
+
+    # One pass over the template instead of one str.replace per row key.
+    return TEMPLATE_PLACEHOLDER.sub(substitute, template)
 
 
-def extract_prompts_from_source(source: dict[str, Any], timeout_seconds: int) -> list[dict[str, str]]:
+def extract_prompts_from_source(
+    source: dict[str, Any], fetcher: SourceCache, timeout_seconds: int
+) -> list[dict[str, str]]:
     source_id = str(source["id"])
     source_url = str(source["url"])
     source_format = str(source["format"]).lower()
     limit = int(source.get("limit", 0))
     shuffle = bool(source.get("shuffle", False))
 
-    raw_text = fetch_text(source_url, timeout_seconds=timeout_seconds)
-    prompts: list[dict[str, str]] = []
+    if source_format not in {"json", "csv"}:
+        raise ValueError(f"source {source_id}: unsupported format '{source_format}'")
+    field = source.get("field")
+    template = source.get("template")
+    if not field and not template:
+        raise ValueError(f"source {source_id}: set either 'field' or 'template'")
+    template_text = str(template) if template else None
+    field_key = str(field)
 
-    if source_format == "json":
-        data = json.loads(raw_text)
-        if not isinstance(data, list):
-            raise ValueError(f"source {source_id}: expected JSON array")
-        field = source.get("field")
-        template = source.get("template")
-        if not field and not template:
-            raise ValueError(f"source {source_id}: set either 'field' or 'template'")
-        for row in data:
-            if not isinstance(row, dict):
-                continue
-            payload = (
-                render_template(str(template), row)
-                if template
-                else str(row.get(str(field), "")).strip()
-            )
-            payload = payload.strip()
-            if payload:
-                prompts.append({"source_id": source_id, "payload": payload})
-    elif source_format == "csv":
-        field = source.get("field")
-        template = source.get("template")
-        if not field and not template:
-            raise ValueError(f"source {source_id}: set either 'field' or 'template'")
-        reader = csv.DictReader(raw_text.splitlines())
-        for row in reader:
-            payload = (
-                render_template(str(template), row)
-                if template
-                else str(row.get(str(field), "")).strip()
-            )
+    prompts: list[dict[str, str]] = []
+    # Parse rows as they stream in; without shuffle, stop reading once the limit is hit.
+    with fetcher.open(source_url, timeout_seconds=timeout_seconds) as stream:
+        payloads: Iterator[str]
+        if source_format == "json":
+            rows = (row for row in iter_json_array(stream, source_id) if isinstance(row, dict))
+            if template_text is None:
+                payloads = (str(row.get(field_key, "")) for row in rows)
+            else:
+                payloads = (render_template(template_text, row) for row in rows)
+        else:
+            text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+            if template_text is None:
+                # Plain rows indexed by the header position avoid building a dict per row.
+                reader = csv.reader(text)
+                header = next(reader, [])
+                if field_key in header:
+                    field_idx = header.index(field_key)
+                    payloads = (row[field_idx] for row in reader if field_idx < len(row))
+                else:
+                    payloads = iter(())
+            else:
+                payloads = (render_template(template_text, row) for row in csv.DictReader(text))
+
+        for payload in payloads:
             payload = payload.strip()
             if payload:
                 prompts.append({"source_id": source_id, "payload": payload})
-    else:
-        raise ValueError(f"source {source_id}: unsupported format '{source_format}'")
+                if limit > 0 and not shuffle and len(prompts) >= limit:
+                    break
 
     if shuffle:
-        random.Random(42).shuffle(prompts)
-    if limit > 0:
+        rng = random.Random(42)
+        # Draw only the rows that are kept instead of shuffling the whole source first.
+        if 0 < limit < len(prompts):
+            return rng.sample(prompts, limit)
+        rng.shuffle(prompts)
+    elif limit > 0:
         prompts = prompts[:limit]
     return prompts
 
@@ -113,66 +669,107 @@ def load_external_cases(settings: dict[str, Any]) -> list[dict[str, Any]]:
         raise ValueError("external_carrier_cycle must be a non-empty list")
 
     timeout_seconds = int(settings["external_fetch_timeout_seconds"])
-    all_prompts: list[dict[str, str]] = []
-    for source in manifest["sources"]:
-        all_prompts.extend(extract_prompts_from_source(source, timeout_seconds=timeout_seconds))
-
+    sources = manifest["sources"]
+    cache_dir = None
+    if settings["external_fetch_cache_enabled"]:
+        cache_dir = Path(str(settings["external_fetch_cache_dir"]).strip() or default_cache_dir()).expanduser()
+    fetch_concurrency = max(1, min(int(settings["external_fetch_concurrency"]), len(sources)))
+    with HttpSession(pool_maxsize=fetch_concurrency) as session, ThreadPoolExecutor(
+        max_workers=fetch_concurrency
+    ) as executor:
+        fetcher = SourceCache(
+            session,
+            cache_dir,
+            ttl_seconds=int(settings["external_fetch_cache_ttl_seconds"]),
+            refresh=bool(settings["external_fetch_refresh"]),
+        )
+        # map() keeps manifest order, so case ids stay stable across runs.
+        results = list(
+            executor.map(
+                lambda source: extract_prompts_from_source(source, fetcher, timeout_seconds=timeout_seconds),
+                sources,
+            )
+        )
+    # Every prompt of a source shares its id, so each source id is sanitized once.
+    source_tags = [safe_tag(str(source["id"])) for source in sources]
+    tagged_prompts = (
+        (source_tag, item["payload"]) for source_tag, prompts in zip(source_tags, results) for item in prompts
+    )
     max_total = int(settings["external_prompts_limit"])
     if max_total > 0:
-        all_prompts = all_prompts[:max_total]
+        tagged_prompts = itertools.islice(tagged_prompts, max_total)
 
-    cases: list[dict[str, Any]] = []
     prefix = safe_tag(str(settings["external_case_prefix"]))
-    for idx, item in enumerate(all_prompts, start=1):
-        carrier = carriers[(idx - 1) % len(carriers)]
-        source_id = safe_tag(item["source_id"])
-        case_id = f"{prefix}_{source_id}_{idx:04d}"
-        case: dict[str, Any] = {
-            "id": case_id,
-            "carrier": carrier,
-            "payload": item["payload"],
+    carrier_count = len(carriers)
+    return [
+        {
+            "id": f"{prefix}_{source_tag}_{idx:04d}",
+            "carrier": carriers[(idx - 1) % carrier_count],
+            "payload": payload,
         }
-        cases.append(case)
-
-    return cases
+        for idx, (source_tag, payload) in enumerate(tagged_prompts, start=1)
+    ]
 
 
-def expand_cases_to_all_carriers(cases: list[dict[str, Any]], settings: dict[str, Any]) -> list[dict[str, Any]]:
+def expand_cases_to_all_carriers(
+    cases: list[dict[str, Any]], settings: dict[str, Any], limit: int = 0
+) -> list[dict[str, Any]]:
     if not settings.get("expand_case_to_all_carriers", False):
-        return cases
+        return cases[:limit] if limit > 0 else cases
 
     carriers = settings.get("expand_carriers", ["label", "env", "cmd"])
     if not isinstance(carriers, list) or not carriers:
         raise ValueError("expand_carriers must be a non-empty list")
 
-    expanded: list[dict[str, Any]] = []
-    for case in cases:
-        payload = case["payload"]
-        base_id = safe_tag(str(case["id"]))
-        for carrier in carriers:
-            new_case = {
-                "id": f"{base_id}_{safe_tag(carrier)}",
-                "carrier": carrier,
-                "payload": payload,
-            }
-            expanded.append(new_case)
-    return expanded
-
-
-def dockerfile_for_case(base_image: str, case: dict[str, Any], canary: str, settings: dict[str, Any]) -> str:
+    carrier_tags = [(carrier, safe_tag(carrier)) for carrier in carriers]
+
+    # Lazy so that a limit stops expanding (and sanitizing ids) once enough cases exist.
+    def expand() -> Iterator[dict[str, Any]]:
+        for case in cases:
+            base_id = safe_tag(str(case["id"]))
+            for carrier, carrier_tag in carrier_tags:
+                yield {"id": f"{base_id}_{carrier_tag}", "carrier": carrier, "payload": case["payload"]}
+
+    expanded = expand()
+    if limit > 0:
+        return list(itertools.islice(expanded, limit))
+    return list(expanded)
+
+
+class DockerfileOptions(NamedTuple):
+    """Dockerfile settings that are constant for a run, read from the settings dict once."""
+
+    base_image: str
+    trace_labels_enabled: bool
+    trace_label_prefix: str
+    payload_label_key: str
+    payload_env_key: str
+    ensure_filesystem_layer: bool
+    layer_source_file: str
+    layer_target_template: str
+
+    @classmethod
+    def from_settings(cls, settings: dict[str, Any]) -> "DockerfileOptions":
+        return cls(
+            base_image=str(settings["base_image"]),
+            trace_labels_enabled=bool(settings.get("trace_labels_enabled", False)),
+            trace_label_prefix=str(settings.get("trace_label_prefix", "org.llmsec")),
+            payload_label_key=str(settings.get("payload_label_key", "payload")),
+            payload_env_key=str(settings.get("payload_env_key", "PAYLOAD")),
+            ensure_filesystem_layer=bool(settings.get("ensure_filesystem_layer", False)),
+            layer_source_file=str(settings.get("layer_source_file", "__llmsec_layer_marker.txt")),
+            layer_target_template=str(settings.get("layer_target_path_template", "/.llmsec/layer_{id}.txt")),
+        )
+
+
+def dockerfile_for_case(case: dict[str, Any], canary: str, options: DockerfileOptions) -> str:
     cid = case["id"]
     carrier = case["carrier"]
     payload = case["payload"]
-    trace_labels_enabled = bool(settings.get("trace_labels_enabled", False))
-    trace_label_prefix = str(settings.get("trace_label_prefix", "org.llmsec"))
-    payload_label_key = str(settings.get("payload_label_key", "payload"))
-    payload_env_key = str(settings.get("payload_env_key", "PAYLOAD"))
-    ensure_filesystem_layer = bool(settings.get("ensure_filesystem_layer", False))
-    layer_source_file = str(settings.get("layer_source_file", "__llmsec_layer_marker.txt"))
-    layer_target_template = str(settings.get("layer_target_path_template", "/.llmsec/layer_{id}.txt"))
-
-    lines = [f"FROM {base_image}"]
-    if trace_labels_enabled:
+
+    lines = [f"FROM {options.base_image}"]
+    if options.trace_labels_enabled:
+        trace_label_prefix = options.trace_label_prefix
         lines.extend(
             [
                 f'LABEL {trace_label_prefix}.case_id="{cid}"',
@@ -181,20 +778,22 @@ def dockerfile_for_case(base_image: str, case: dict[str, Any], canary: str, sett
             ]
         )
 
-    inline_payload = payload.replace("\r", " ").replace("\n", " ").strip()
+    inline = inline_payload(payload)
 
-    if ensure_filesystem_layer:
-        layer_target = layer_target_template.format(id=safe_tag(str(cid)))
-        lines.append(f"COPY {layer_source_file} {layer_target}")
+    if options.ensure_filesystem_layer:
+        case_tag = safe_tag(str(cid))
+        layer_target = options.layer_target_template.format(id=case_tag)
+        # Markers sit flat in one build context shared by all cases, prefixed with the case id.
+        lines.append(f"COPY {case_tag}.{options.layer_source_file} {layer_target}")
 
     if carrier == "label":
-        escaped_payload = escape_docker_quoted(inline_payload)
-        lines.append(f'LABEL {payload_label_key}="{escaped_payload}"')
+        escaped_payload = escape_docker_quoted(inline)
+        lines.append(f'LABEL {options.payload_label_key}="{escaped_payload}"')
     elif carrier == "env":
-        escaped_payload = escape_docker_quoted(inline_payload)
-        lines.append(f'ENV {payload_env_key}="{escaped_payload}"')
+        escaped_payload = escape_docker_quoted(inline)
+        lines.append(f'ENV {options.payload_env_key}="{escaped_payload}"')
     elif carrier == "cmd":
-        escaped = inline_payload.replace("\\", "\\\\").replace("\"", "\\\"")
+        escaped = inline.translate(CMD_ESCAPE_TABLE)
         lines.append(f'CMD ["sh", "-lc", "echo \"{escaped}\""]')
     else:
         raise ValueError(f"case {cid}: unknown carrier '{carrier}'")
@@ -203,14 +802,15 @@ def dockerfile_for_case(base_image: str, case: dict[str, Any], canary: str, sett
 
 
 def validate_case(case: dict[str, Any]) -> None:
-    required = ["id", "carrier", "payload"]
-    missing = [field for field in required if field not in case or not str(case[field]).strip()]
+    carrier = case.get("carrier")
+    # Well-formed cases pass on the carrier check and one strip per field; the error path lists every gap.
+    if carrier in ALLOWED_CARRIERS and all(str(case.get(field, "")).strip() for field in REQUIRED_CASE_FIELDS):
+        return
+
+    missing = [field for field in REQUIRED_CASE_FIELDS if field not in case or not str(case[field]).strip()]
     if missing:
         raise ValueError(f"case is missing required fields: {', '.join(missing)}")
-
-    allowed_carriers = {"label", "env", "cmd"}
-    if case["carrier"] not in allowed_carriers:
-        raise ValueError(f"case {case['id']}: unsupported carrier '{case['carrier']}'")
+    raise ValueError(f"case {case['id']}: unsupported carrier '{carrier}'")
 
 
 def build_image_ref(registry: str, repo: str, image_name: str, tag: str) -> str:
@@ -250,52 +850,195 @@ def default_docker_config_dirs(container_cli: str) -> list[Path]:
     return deduped
 
 
-def resolve_docker_config_dir(settings: dict[str, Any], container_cli: str, registry: str) -> Path:
+def resolve_docker_config_dir(
+    settings: dict[str, Any], container_cli: str, registry: str
+) -> tuple[Path, Optional[dict[str, Any]]]:
+    """Pick the Docker config dir and return it with its parsed config.json (None if absent)."""
     configured = str(settings.get("docker_config", "")).strip()
     if configured:
-        return Path(configured).expanduser()
+        config_dir = Path(configured).expanduser()
+        return config_dir, read_docker_config(config_dir)
 
     candidates = default_docker_config_dirs(container_cli)
     require_auth = bool(settings.get("require_registry_auth_entry", True))
 
     if require_auth:
         for candidate in candidates:
-            if has_registry_auth_entry(candidate, registry):
-                return candidate
+            config = read_docker_config(candidate)
+            if config_has_registry_auth(config, registry):
+                return candidate, config
 
     for candidate in candidates:
         if (candidate / "config.json").exists():
-            return candidate
+            return candidate, read_docker_config(candidate)
 
-    return candidates[0]
+    return candidates[0], None
 
 
-def has_registry_auth_entry(config_dir: Path, registry: str) -> bool:
+def read_docker_config(config_dir: Path) -> Optional[dict[str, Any]]:
     config_path = config_dir / "config.json"
     if not config_path.exists():
-        return False
+        return None
 
     try:
-        data = load_json(config_path)
+        data = load_json_cached(config_path)
     except Exception:
-        return False
+        return None
 
-    if not isinstance(data, dict):
+    return data if isinstance(data, dict) else None
+
+
+def config_has_registry_auth(config: Optional[dict[str, Any]], registry: str) -> bool:
+    if config is None:
         return False
 
     keys = {registry, f"https://{registry}", f"http://{registry}"}
-    auths = data.get("auths", {})
-    helpers = data.get("credHelpers", {})
-
-    if isinstance(auths, dict):
-        if any(key in auths for key in keys):
-            return True
-    if isinstance(helpers, dict):
-        if any(key in helpers for key in keys):
-            return True
+    auths = config.get("auths", {})
+    helpers = config.get("credHelpers", {})
+
+    if isinstance(auths, dict) and not keys.isdisjoint(auths):
+        return True
+    if isinstance(helpers, dict) and not keys.isdisjoint(helpers):
+        return True
     return False
 
 
+def write_runlist_summary(stream_file: Path, out_file: Path) -> None:
+    with stream_file.open("rb") as stream:
+        runlist = json_loads(next(stream))
+        runlist["images"] = [json_loads(line) for line in stream if line.strip()]
+    out_file.write_bytes(json_dumps(runlist, indent=True))
+
+
+class ImageBuilder:
+    """Per-run build state shared by the build workers; build() turns one case into one image."""
+
+    def __init__(
+        self,
+        settings: dict[str, Any],
+        cli_argv: list[str],
+        cli_env: dict[str, str],
+        build_argv: list[str],
+        buildx_push: bool,
+        suite_name: str,
+        ts: str,
+        build_context: Path,
+        built_images: Optional[dict[str, str]],
+        base_image_id: str,
+    ) -> None:
+        self.settings = settings
+        self.cli_argv = cli_argv
+        self.cli_env = cli_env
+        self.build_argv = build_argv
+        self.buildx_push = buildx_push
+        self.suite_name = suite_name
+        self.ts = ts
+        self.build_context = build_context
+        # None unless reuse_built_images is on; maps build context digests to the last tag built from them.
+        self.built_images = built_images
+        self.base_image_id = base_image_id.encode("utf-8") + b"\0" if base_image_id else b""
+        self.prefix_tag = safe_tag(str(settings["tag_prefix"])) if settings["tag_prefix"] else ""
+        self.dockerfile_options = DockerfileOptions.from_settings(settings)
+        self.marker_name = ""
+        if self.dockerfile_options.ensure_filesystem_layer:
+            self.marker_name = self.dockerfile_options.layer_source_file
+        self._built_contexts: dict[str, Future[str]] = {}
+        self._lock = threading.Lock()
+
+    def retag_argv(self, source: str, target: str) -> list[str]:
+        if self.buildx_push:
+            # Pushed images may not exist locally, so copy the manifest within the registry instead.
+            return self.cli_argv + ["buildx", "imagetools", "create", "--tag", target, source]
+        return self.cli_argv + ["tag", source, target]
+
+    def _retag_previous(self, source: str, target: str) -> bool:
+        # The image may have been pruned since it was recorded; the caller then builds it again.
+        result = subprocess.run(self.retag_argv(source, target), env=self.cli_env, capture_output=True)
+        return result.returncode == 0
+
+    def build(self, case: dict[str, Any]) -> dict[str, Any]:
+        payload = case["payload"]
+        cid = safe_tag(case["id"])
+        canary = f"PWNED_CANARY_{cid}"
+
+        tag_core = f"{self.suite_name}-{cid}-{self.ts}"
+        if self.prefix_tag:
+            tag_core = f"{self.prefix_tag}-{tag_core}"
+
+        tag = build_image_ref(
+            registry=str(self.settings["registry"]),
+            repo=str(self.settings["repo"]),
+            image_name=str(self.settings["image_name"]),
+            tag=tag_core,
+        )
+
+        dockerfile = dockerfile_for_case(case, canary, self.dockerfile_options).encode("utf-8")
+        marker = b""
+        if self.marker_name:
+            marker = f"case_id={case['id']}\ncarrier={case['carrier']}\ncanary={canary}\n".encode("utf-8")
+
+        # Cases whose build context is byte-identical are built once and re-tagged.
+        context_hash = hashlib.blake2b(self.base_image_id + dockerfile + b"\0" + marker, digest_size=16).hexdigest()
+        with self._lock:
+            source_build = self._built_contexts.get(context_hash)
+            if source_build is None:
+                source_build = self._built_contexts[context_hash] = Future()
+                is_owner = True
+            else:
+                is_owner = False
+
+        if is_owner:
+            try:
+                self._build_context(case, cid, tag, context_hash, dockerfile, marker)
+            except BaseException as exc:
+                source_build.set_exception(exc)
+                raise
+            source_build.set_result(tag)
+        else:
+            # The owning case was submitted earlier, so it is already running on another worker.
+            run(self.retag_argv(source_build.result(), tag), env=self.cli_env)
+
+        if self.settings["push"] and not self.buildx_push:
+            run(self.cli_argv + ["push", tag], env=self.cli_env)
+
+        return {
+            "case_id": case["id"],
+            "carrier": case["carrier"],
+            "tag": tag,
+            "canary": canary,
+            "path": case.get("path"),
+            "payload_preview": payload if len(payload) <= 140 else payload[:140] + "...",
+        }
+
+    def _build_context(
+        self, case: dict[str, Any], cid: str, tag: str, context_hash: str, dockerfile: bytes, marker: bytes
+    ) -> None:
+        previous = self.built_images.get(context_hash) if self.built_images is not None else None
+        if previous and self._retag_previous(previous, tag):
+            print(f"\nReusing {previous} for {case['id']}: build context unchanged")
+        elif not self.marker_name:
+            # Nothing to COPY: pipe the Dockerfile on stdin.
+            run(
+                self.build_argv + ["-t", tag, "-f", "-", "."],
+                cwd=self.build_context,
+                env=self.cli_env,
+                stdin=dockerfile,
+            )
+        else:
+            write_file_bytes(self.build_context / f"{cid}.{self.marker_name}", marker)
+            write_file_bytes(self.build_context / f"{cid}.Dockerfile", dockerfile)
+
+            run(
+                self.build_argv + ["-t", tag, "-f", f"{cid}.Dockerfile", "."],
+                cwd=self.build_context,
+                env=self.cli_env,
+            )
+
+        if self.built_images is not None:
+            with self._lock:
+                self.built_images[context_hash] = tag
+
+
 def get_effective_settings(args: argparse.Namespace) -> dict[str, Any]:
     config_path = Path(args.config)
     config = load_json(config_path)
@@ -330,7 +1073,17 @@ def get_effective_settings(args: argparse.Namespace) -> dict[str, Any]:
         "external_case_prefix": "ext",
         "external_carrier_cycle": ["label", "env", "cmd"],
         "external_fetch_timeout_seconds": 30,
+        "external_fetch_concurrency": 16,
+        "external_fetch_cache_enabled": True,
+        "external_fetch_cache_dir": "",
+        "external_fetch_cache_ttl_seconds": 3600,
+        "external_fetch_refresh": False,
         "max_images": 0,
+        "build_concurrency": 1,
+        "buildx_builder": "",
+        "runlist_json_summary": True,
+        "reuse_built_images": False,
+        "buildx_push": False,
     }
     settings = {**defaults, **config}
 
@@ -358,6 +1111,8 @@ def get_effective_settings(args: argparse.Namespace) -> dict[str, Any]:
         "tag_prefix",
         "timestamp_format",
         "max_images",
+        "build_concurrency",
+        "buildx_builder",
     ]:
         value = getattr(args, key, None)
         if value is not None:
@@ -367,6 +1122,8 @@ def get_effective_settings(args: argparse.Namespace) -> dict[str, Any]:
         settings["push"] = True
     if args.no_push:
         settings["push"] = False
+    if args.refresh_external:
+        settings["external_fetch_refresh"] = True
     if args.pull_base:
         settings["pull_base"] = True
     if args.no_pull_base:
@@ -393,11 +1150,18 @@ def main() -> None:
     parser.add_argument("--tag-prefix", dest="tag_prefix")
     parser.add_argument("--timestamp-format", dest="timestamp_format")
     parser.add_argument("--max-images", dest="max_images", type=int)
+    parser.add_argument("--build-concurrency", dest="build_concurrency", type=int)
+    parser.add_argument("--buildx-builder", dest="buildx_builder")
 
     parser.add_argument("--push", action="store_true", help="Override config: push images")
     parser.add_argument("--no-push", action="store_true", help="Override config: do not push images")
     parser.add_argument("--pull-base", action="store_true", help="Override config: pull base image")
     parser.add_argument("--no-pull-base", action="store_true", help="Override config: do not pull base image")
+    parser.add_argument(
+        "--refresh-external",
+        action="store_true",
+        help="Revalidate cached external prompt sources even if they are within the cache TTL",
+    )
 
     args = parser.parse_args()
     settings = get_effective_settings(args)
@@ -409,13 +1173,13 @@ def main() -> None:
     if not isinstance(cli_args, list):
         raise ValueError("container_cli_args must be a JSON array of CLI arguments")
 
-    docker_config_dir = resolve_docker_config_dir(
+    docker_config_dir, docker_config = resolve_docker_config_dir(
         settings=settings,
         container_cli=container_cli,
         registry=str(settings["registry"]),
     )
     if bool(settings.get("require_registry_auth_entry", True)):
-        if not has_registry_auth_entry(docker_config_dir, str(settings["registry"])):
+        if not config_has_registry_auth(docker_config, str(settings["registry"])):
             checked = [str(d / "config.json") for d in default_docker_config_dirs(container_cli)]
             raise ValueError(
                 f"No registry auth entry for '{settings['registry']}'. "
@@ -435,8 +1199,30 @@ def main() -> None:
             "insecure-registries config; no CLI flag is applied."
         )
 
-    cli_cmd = " ".join([shlex.quote(container_cli)] + [shlex.quote(arg) for arg in effective_cli_args])
-    cli_prefix = f"DOCKER_CONFIG={shlex.quote(str(docker_config_dir))} {cli_cmd}"
+    cli_argv = [container_cli] + effective_cli_args
+    cli_env = {**os.environ, "DOCKER_CONFIG": str(docker_config_dir)}
+    if container_cli == "docker":
+        # BuildKit lets parallel builds share the daemon-side cache.
+        cli_env["DOCKER_BUILDKIT"] = "1"
+
+    buildx_push = False
+    if settings["push"] and bool(settings.get("buildx_push", False)):
+        if container_cli == "docker" and buildx_available(cli_argv, cli_env):
+            buildx_push = True
+        else:
+            print(f"WARNING: buildx_push needs docker buildx; {container_cli} builds and pushes in separate steps.")
+    # Fused builds stream layers straight to the registry; otherwise --load keeps results local for tag/push.
+    buildx_output = "--push" if buildx_push else "--load"
+
+    build_argv = cli_argv + ["build"]
+    buildx_builder = str(settings.get("buildx_builder", "")).strip()
+    if buildx_builder and container_cli == "docker":
+        ensure_buildx_builder(cli_argv, cli_env, buildx_builder)
+        build_argv = cli_argv + ["buildx", "build", "--builder", buildx_builder, buildx_output]
+    elif buildx_builder:
+        print("WARNING: buildx_builder is ignored for nerdctl, which always builds through buildkitd.")
+    elif buildx_push:
+        build_argv = cli_argv + ["buildx", "build", buildx_output]
 
     suite_path = Path(settings["suite"])
     outdir = Path(settings["outdir"])
@@ -458,22 +1244,28 @@ def main() -> None:
 
     external_cases = load_external_cases(settings)
     cases.extend(external_cases)
-    cases = expand_cases_to_all_carriers(cases, settings)
-
     max_images = int(settings.get("max_images", 0))
-    if max_images > 0:
-        cases = cases[:max_images]
+    cases = expand_cases_to_all_carriers(cases, settings, limit=max_images)
 
+    # Image tags and per-case context files are named by the sanitized id, so two ids that sanitize alike
+    # (e.g. "a b" and "a-b") would overwrite each other's files and tags.
+    case_tags: dict[str, str] = {}
     for case in cases:
         validate_case(case)
+        case_tag = safe_tag(str(case["id"]))
+        if case_tag in case_tags:
+            if case_tags[case_tag] == str(case["id"]):
+                raise ValueError(f"duplicate case id '{case_tag}'")
+            raise ValueError(f"case ids '{case_tags[case_tag]}' and '{case['id']}' both sanitize to '{case_tag}'")
+        case_tags[case_tag] = str(case["id"])
 
     ts = dt.datetime.now(dt.timezone.utc).strftime(settings["timestamp_format"])
     suite_name = safe_tag(suite_path.stem)
 
     if settings["pull_base"]:
-        run(f"{cli_prefix} pull {shlex.quote(settings['base_image'])}")
+        run(cli_argv + ["pull", str(settings["base_image"])], env=cli_env)
 
-    runlist = {
+    runlist_header = {
         "generated_at_utc": ts,
         "base_image": settings["base_image"],
         "registry": settings["registry"],
@@ -488,53 +1280,81 @@ def main() -> None:
         "container_cli_args": effective_cli_args,
         "docker_config": str(docker_config_dir),
         "insecure_registry": insecure_registry,
-        "images": [],
     }
 
-    for case in cases:
-        cid = safe_tag(case["id"])
-        canary = f"PWNED_CANARY_{cid}"
-
-        tag_core = f"{suite_name}-{cid}-{ts}"
-        if settings["tag_prefix"]:
-            tag_core = f"{safe_tag(settings['tag_prefix'])}-{tag_core}"
-
-        tag = build_image_ref(
-            registry=str(settings["registry"]),
-            repo=str(settings["repo"]),
-            image_name=str(settings["image_name"]),
-            tag=tag_core,
-        )
-
-        workdir = outdir / f"work_{suite_name}_{cid}_{ts}"
-        workdir.mkdir(parents=True, exist_ok=True)
-
-        dockerfile = dockerfile_for_case(settings["base_image"], case, canary, settings)
-        if bool(settings.get("ensure_filesystem_layer", False)):
-            marker_name = str(settings.get("layer_source_file", "__llmsec_layer_marker.txt"))
-            marker_content = f"case_id={case['id']}\ncarrier={case['carrier']}\ncanary={canary}\n"
-            (workdir / marker_name).write_text(marker_content, encoding="utf-8")
-        (workdir / "Dockerfile").write_text(dockerfile, encoding="utf-8")
-
-        run(f"{cli_prefix} build -t {shlex.quote(tag)} -f Dockerfile .", cwd=workdir)
-
-        if settings["push"]:
-            run(f"{cli_prefix} push {shlex.quote(tag)}")
-
-        runlist["images"].append(
-            {
-                "case_id": case["id"],
-                "carrier": case["carrier"],
-                "tag": tag,
-                "canary": canary,
-                "path": case.get("path"),
-                "payload_preview": case["payload"][:140] + ("..." if len(case["payload"]) > 140 else ""),
-            }
-        )
+    # Maps a build context digest to the last tag built from it, so unchanged cases are re-tagged on later runs.
+    built_images_file = outdir / "built_images.json"
+    built_images: Optional[dict[str, str]] = None
+    # The digest includes the resolved base image ID, so a re-pulled or moved base tag forces a rebuild.
+    base_image_id = ""
+    if bool(settings.get("reuse_built_images", False)):
+        image_id = resolve_image_id(cli_argv, cli_env, str(settings["base_image"]))
+        if image_id is None:
+            print(
+                f"WARNING: reuse_built_images is off for this run: {settings['base_image']} is not in the local "
+                "image store, so images built on it cannot be matched."
+            )
+        else:
+            base_image_id = image_id
+            built_images = load_json(built_images_file) if built_images_file.exists() else {}
+
+    # One context for the whole run; BuildKit only transfers the files a build actually COPYs.
+    build_context = outdir / f"ctx_{suite_name}_{ts}"
+    build_context.mkdir(parents=True, exist_ok=True)
+
+    builder = ImageBuilder(
+        settings,
+        cli_argv=cli_argv,
+        cli_env=cli_env,
+        build_argv=build_argv,
+        buildx_push=buildx_push,
+        suite_name=suite_name,
+        ts=ts,
+        build_context=build_context,
+        built_images=built_images,
+        base_image_id=base_image_id,
+    )
 
-    out_file = outdir / f"runlist_{suite_name}_{ts}.json"
-    out_file.write_text(json.dumps(runlist, indent=2), encoding="utf-8")
-    print(f"\\nWrote runlist: {out_file}")
+    # Records are appended in case order as soon as each case and all cases before it are done, and flushed
+    # line by line, so partial progress survives an interrupted run.
+    stream_file = outdir / f"runlist_{suite_name}_{ts}.jsonl"
+    build_concurrency = int(settings.get("build_concurrency", 1)) or os.cpu_count() or 1
+    failed: list[str] = []
+    with stream_file.open("wb") as stream:
+        stream.write(json_dumps(runlist_header) + b"\n")
+        stream.flush()
+        executor = ThreadPoolExecutor(max_workers=build_concurrency)
+        try:
+            futures = [executor.submit(builder.build, case) for case in cases]
+            # One failed build must not drop the records of builds that succeeded around it.
+            for case, future in zip(cases, futures):
+                try:
+                    record = future.result()
+                except subprocess.CalledProcessError as exc:
+                    print(f"\nERROR: case {case['id']}: {exc}", file=sys.stderr)
+                    failed.append(str(case["id"]))
+                    continue
+                stream.write(json_dumps(record) + b"\n")
+                stream.flush()
+        except BaseException:
+            # On Ctrl-C drop the queued builds instead of draining them; running ones get the signal too.
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+    print(f"\nWrote runlist: {stream_file}")
+
+    if built_images is not None:
+        tmp_file = built_images_file.with_name(built_images_file.name + ".tmp")
+        write_file_bytes(tmp_file, json_dumps(built_images, indent=True))
+        os.replace(tmp_file, built_images_file)
+
+    if bool(settings.get("runlist_json_summary", True)):
+        out_file = outdir / f"runlist_{suite_name}_{ts}.json"
+        write_runlist_summary(stream_file, out_file)
+        print(f"\nWrote runlist summary: {out_file}")
+
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(cases)} image builds failed: {', '.join(failed)}")
 
 
 if __name__ == "__main__":
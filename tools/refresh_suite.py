@@ -1,70 +1,16 @@
 #!/usr/bin/env python3
 import argparse
-import csv
 import json
-import random
-import urllib.request
 from pathlib import Path
 from typing import Any
 
+from build_push import HttpSession, SourceCache, default_cache_dir, extract_prompts_from_source, load_json
 
-def load_json(path: Path) -> Any:
-    with path.open('r', encoding='utf-8') as f:
-        return json.load(f)
 
-
-def fetch_text(url: str, timeout_seconds: int = 30) -> str:
-    with urllib.request.urlopen(url, timeout=timeout_seconds) as response:
-        return response.read().decode('utf-8')
-
-
-def render_template(template: str, row: dict[str, Any]) -> str:
-    result = template
-    for key, value in row.items():
-        result = result.replace(f'{{{{{key}}}}}', str(value if value is not None else ''))
-    return result
-
-
-def prompts_from_source(source: dict[str, Any], timeout_seconds: int) -> list[str]:
-    source_format = str(source['format']).lower()
-    raw_text = fetch_text(str(source['url']), timeout_seconds=timeout_seconds)
-
-    prompts: list[str] = []
-    if source_format == 'json':
-        rows = json.loads(raw_text)
-        if not isinstance(rows, list):
-            raise ValueError('source JSON must be an array')
-        field = source.get('field')
-        template = source.get('template')
-        if not field and not template:
-            raise ValueError("source requires either 'field' or 'template'")
-        for row in rows:
-            if not isinstance(row, dict):
-                continue
-            payload = render_template(str(template), row) if template else str(row.get(str(field), ''))
-            payload = payload.strip()
-            if payload:
-                prompts.append(payload)
-    elif source_format == 'csv':
-        field = source.get('field')
-        template = source.get('template')
-        if not field and not template:
-            raise ValueError("source requires either 'field' or 'template'")
-        for row in csv.DictReader(raw_text.splitlines()):
-            payload = render_template(str(template), row) if template else str(row.get(str(field), ''))
-            payload = payload.strip()
-            if payload:
-                prompts.append(payload)
-    else:
-        raise ValueError(f"unsupported source format: {source_format}")
-
-    if bool(source.get('shuffle', False)):
-        random.Random(42).shuffle(prompts)
-    limit = int(source.get('limit', 0))
-    if limit > 0:
-        prompts = prompts[:limit]
-
-    return prompts
+def prompts_from_source(source: dict[str, Any], fetcher: SourceCache, timeout_seconds: int) -> list[str]:
+    # Same streaming JSON/CSV parsing as build_push: rows are consumed as they are read, not split up front.
+    prompts = extract_prompts_from_source(source, fetcher, timeout_seconds=timeout_seconds)
+    return [prompt['payload'] for prompt in prompts]
 
 
 def main() -> None:
@@ -83,6 +29,12 @@ def main() -> None:
     parser.add_argument('--id-prefix', default='cyberseceval_en', help='Prefix for generated external case IDs')
     parser.add_argument('--source-id', default='promptfoo_cyberseceval_en', help='Source id from manifest to use')
     parser.add_argument('--timeout-seconds', type=int, default=30, help='HTTP timeout for external source fetch')
+    parser.add_argument(
+        '--cache-dir',
+        default=str(default_cache_dir()),
+        help='Directory for cached source downloads (revalidated with ETag/Last-Modified on every run)',
+    )
+    parser.add_argument('--no-cache', action='store_true', help='Always download the source in full')
     args = parser.parse_args()
 
     manifest = load_json(Path(args.manifest))
@@ -98,7 +50,10 @@ def main() -> None:
     if selected is None:
         raise ValueError(f"source id not found in manifest: {args.source_id}")
 
-    prompts = prompts_from_source(selected, timeout_seconds=args.timeout_seconds)
+    cache_dir = None if args.no_cache else Path(args.cache_dir).expanduser()
+    with HttpSession() as session:
+        fetcher = SourceCache(session, cache_dir, ttl_seconds=0)
+        prompts = prompts_from_source(selected, fetcher, timeout_seconds=args.timeout_seconds)
 
     generated_cases = [
         {
@@ -110,6 +65,7 @@ def main() -> None:
     ]
 
     external_out_path = Path(args.external_out)
+    # Stays on stdlib json: ensure_ascii keeps the committed suite file's escaping stable across refreshes.
     external_out_path.write_text(
         json.dumps(generated_cases, indent=2, ensure_ascii=True) + '\n',
         encoding='utf-8',